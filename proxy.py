@@ -4,17 +4,21 @@ Manages per-user Docker containers with auto-sleep (15 min idle timeout)
 """
 
 import asyncio
+import heapq
 import logging
 import hashlib
+from collections import defaultdict
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Dict, Optional, Tuple
 from dataclasses import dataclass, asdict
 from time import time
 
 import docker
 import httpx
-from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from fastapi.responses import StreamingResponse, JSONResponse
+from starlette.background import BackgroundTask
 from contextlib import asynccontextmanager
 import uvicorn
 
@@ -41,6 +45,7 @@ class ContainerInfo:
     last_used: float
     created_at: float
     status: str  # 'running' or 'stopped'
+    status_checked_at: float = 0.0  # last time 'running' was confirmed against Docker
 
     def to_dict(self):
         return asdict(self)
@@ -65,37 +70,140 @@ class SessionInfo:
 # Container registry: hash -> ContainerInfo
 container_registry: Dict[str, ContainerInfo] = {}
 
+# Count of registry entries currently 'running', maintained at every status
+# transition so /health never has to walk the registry
+running_containers = 0
+
 # MCP Session registry: api_key_hash -> SessionInfo
 # Maintains session IDs returned by the MCP server for stateful HTTP MCP protocol
 mcp_sessions: Dict[str, SessionInfo] = {}
 
+# Validation cache: api_key_hash -> expiry timestamp
+# Only successful validations are cached so a rotated/revoked key is never
+# served from stale state longer than the TTL
+validated_keys: Dict[str, float] = {}
+
+# Per-key locks so concurrent first-time validations coalesce into one upstream call
+validation_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+# Per-key locks so concurrent requests for the same key share one cold-start
+container_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
 # Port allocator
+# allocated_ports is bootstrapped from Docker once at startup; after that the
+# proxy is the sole allocator in [BASE_PORT, MAX_PORT) so no Docker scan is needed.
+# free_ports is a min-heap so allocation and release are O(log N)
 allocated_ports: set = set()
-NEXT_PORT = 4000
+BASE_PORT = 4000
 MAX_PORT = 5000
+free_ports: list = list(range(BASE_PORT, MAX_PORT))
 
 # Cleanup task handle
 cleanup_task: Optional[asyncio.Task] = None
 
+# Docker events listener (task + stream handle so shutdown can close it)
+events_task: Optional[asyncio.Task] = None
+docker_events = None
+# Set during shutdown so the listener can tell a closed stream apart from
+# a daemon outage (which it should survive by reconnecting)
+events_shutdown = False
+
+# Gate so concurrent cold-starts share a single image pull
+image_pull_lock = asyncio.Lock()
+
 # Docker client
 docker_client: Optional[docker.DockerClient] = None
 
+# Shared HTTP clients (created in lifespan, closed on shutdown)
+# Long-lived pooled clients avoid a fresh TCP+TLS handshake per request
+outline_client: Optional[httpx.AsyncClient] = None
+proxy_client: Optional[httpx.AsyncClient] = None
+
 # Configuration
 IDLE_TIMEOUT_SECONDS = 15 * 60  # 15 minutes
+VALIDATION_TTL = 5 * 60  # 5 minutes - how long a successful key validation is trusted
+STATUS_CACHE_TTL = 3  # seconds - how long a confirmed 'running' status is trusted
 MCP_SESSION_TIMEOUT = 60 * 60  # 1 hour - sessions expire after 1 hour of inactivity
 CONTAINER_IMAGE = "ghcr.io/vortiago/mcp-outline:latest"
 CONTAINER_MEMORY = "256m"
 CONTAINER_CPU = "0.3"
 REQUEST_TIMEOUT = 90  # seconds
 
+# Request headers forwarded to the container (ASGI raw names are lowercase bytes)
+FORWARDED_REQUEST_HEADERS = frozenset((b"content-type", b"user-agent", b"cache-control"))
+
+# Always sent so the MCP streamable-http server answers with SSE when appropriate
+ACCEPT_HEADER = (b"accept", b"application/json, text/event-stream")
+
+# Responses are relayed raw (undecoded), so ask the container not to compress:
+# httpx's default "gzip, deflate" would corrupt the stream if it ever did
+ACCEPT_ENCODING_HEADER = (b"accept-encoding", b"identity")
+
 # ============================================================================
 # UTILITY FUNCTIONS
 # ============================================================================
 
+@lru_cache(maxsize=4096)
 def hash_api_key(api_key: str) -> str:
-    """Generate container name from API key (first 12 chars of SHA256)"""
-    hash_obj = hashlib.sha256(api_key.encode())
-    return f"mcp-{hash_obj.hexdigest()[:12]}"
+    """Generate container name from API key (12 hex chars of blake2b)
+
+    blake2b with digest_size=6 yields the 12-char identifier directly in a
+    single compression, unlike hashing full SHA-256 and slicing.
+    Memoized: called several times per request on the critical path.
+    """
+    hash_obj = hashlib.blake2b(api_key.encode(), digest_size=6)
+    return f"mcp-{hash_obj.hexdigest()}"
+
+
+_iso_now_cache = [0, ""]
+
+
+def iso_now() -> str:
+    """Current UTC time in ISO format, cached with 1-second granularity
+
+    datetime.now + isoformat is surprisingly costly under frequent
+    health/stats probing; one format per second is plenty of resolution.
+    """
+    now = int(time())
+    if now != _iso_now_cache[0]:
+        _iso_now_cache[0] = now
+        _iso_now_cache[1] = datetime.fromtimestamp(now, tz=timezone.utc).isoformat()
+    return _iso_now_cache[1]
+
+
+@lru_cache(maxsize=4096)
+def auth_headers(api_key: str) -> Dict[str, str]:
+    """Reusable Authorization header dict, built once per distinct key"""
+    return {"Authorization": f"Bearer {api_key}"}
+
+
+def mark_status(info: ContainerInfo, status: str) -> None:
+    """Update a container's status, keeping the running counter in sync"""
+    global running_containers
+    if status == "running" and info.status != "running":
+        running_containers += 1
+    elif status != "running" and info.status == "running":
+        running_containers -= 1
+    info.status = status
+    info.status_checked_at = time() if status == "running" else 0.0
+
+
+def register_container(info: ContainerInfo) -> None:
+    """Insert a registry entry, keeping the running counter in sync"""
+    global running_containers
+    container_registry[info.api_key_hash] = info
+    if info.status == "running":
+        running_containers += 1
+
+
+def drop_registry_entry(api_key_hash: str) -> None:
+    """Remove a registry entry, releasing its port and updating the counter"""
+    global running_containers
+    info = container_registry.pop(api_key_hash, None)
+    if info is not None:
+        if info.status == "running":
+            running_containers -= 1
+        release_port(info.port)
 
 
 def save_mcp_session(api_key_hash: str, session_id: str) -> None:
@@ -136,48 +244,100 @@ def cleanup_expired_sessions() -> None:
 
 
 async def validate_outline_key(api_key: str) -> bool:
-    """Validate API key by calling Outline's auth.info endpoint"""
-    try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.post(
+    """Validate API key by calling Outline's auth.info endpoint
+
+    Successful validations are cached for VALIDATION_TTL seconds so repeat
+    requests skip the upstream round-trip; failures are never cached.
+    """
+    api_key_hash = hash_api_key(api_key)
+
+    # Fast path: recently validated
+    if validated_keys.get(api_key_hash, 0) > time():
+        return True
+
+    # Serialize concurrent first-time validations for the same key so only
+    # one upstream call goes out (the rest hit the cache below)
+    async with validation_locks[api_key_hash]:
+        if validated_keys.get(api_key_hash, 0) > time():
+            return True
+
+        try:
+            response = await outline_client.post(
                 "https://app.getoutline.com/api/auth.info",
-                headers={"Authorization": f"Bearer {api_key}"},
+                headers=auth_headers(api_key),
                 json={}
             )
-            return response.status_code == 200
-    except Exception as e:
-        logger.warning(f"Failed to validate API key: {str(e)}")
-        # For now, return False on any error - be conservative
-        return False
+            if response.status_code == 200:
+                validated_keys[api_key_hash] = time() + VALIDATION_TTL
+                return True
+            return False
+        except Exception as e:
+            logger.warning(f"Failed to validate API key: {str(e)}")
+            # For now, return False on any error - be conservative
+            return False
 
 
-def get_next_available_port() -> int:
-    """Find next available port for container"""
-    global NEXT_PORT, allocated_ports
+def cleanup_expired_validations() -> None:
+    """Remove expired API key validation entries"""
+    current_time = time()
+    expired_hashes = [
+        key_hash for key_hash, expiry in validated_keys.items()
+        if expiry <= current_time
+    ]
+    for key_hash in expired_hashes:
+        del validated_keys[key_hash]
+        logger.debug(f"Expired cached validation for {key_hash}")
+
+    # Locks accumulate for every key ever presented, including invalid ones;
+    # sweep any not backing a cached validation and not currently held
+    for key_hash in list(validation_locks.keys()):
+        if key_hash not in validated_keys and not validation_locks[key_hash].locked():
+            del validation_locks[key_hash]
+
+
+async def bootstrap_allocated_ports() -> None:
+    """One-shot recovery of port allocations from containers already on disk
 
-    # Get ports already in use by Docker containers
+    Runs at startup so get_next_available_port never needs to scan Docker.
+    """
     try:
         client = get_docker_client()
-        containers = client.containers.list(all=True)
-        used_ports = set()
+        containers = await asyncio.to_thread(client.containers.list, all=True)
         for container in containers:
             ports = container.ports
             if ports and '3000/tcp' in ports:
-                port = int(ports['3000/tcp'][0]['HostPort'])
-                used_ports.add(port)
+                allocated_ports.add(int(ports['3000/tcp'][0]['HostPort']))
+        logger.info(f"Bootstrapped {len(allocated_ports)} allocated ports from Docker")
     except Exception as e:
-        logger.warning(f"Could not get Docker ports: {str(e)}")
-        used_ports = set()
+        logger.warning(f"Could not bootstrap ports from Docker: {str(e)}")
+
+
+def initialize_port_pool() -> None:
+    """Rebuild the free-port heap, excluding ports recovered at bootstrap"""
+    global free_ports
+    free_ports = [port for port in range(BASE_PORT, MAX_PORT) if port not in allocated_ports]
+    heapq.heapify(free_ports)
 
-    # Find first available port
-    for port in range(NEXT_PORT, MAX_PORT):
-        if port not in allocated_ports and port not in used_ports:
+
+def get_next_available_port() -> int:
+    """Pop the lowest free port from the heap (O(log N))"""
+    while free_ports:
+        port = heapq.heappop(free_ports)
+        # Recovered containers mark ports allocated without touching the heap
+        if port not in allocated_ports:
             allocated_ports.add(port)
             return port
 
     raise RuntimeError(f"No available ports (max: {MAX_PORT})")
 
 
+def release_port(port: int) -> None:
+    """Return a port to the pool once its container is removed"""
+    if port in allocated_ports:
+        allocated_ports.discard(port)
+        heapq.heappush(free_ports, port)
+
+
 # ============================================================================
 # DOCKER MANAGEMENT FUNCTIONS
 # ============================================================================
@@ -190,85 +350,73 @@ def get_docker_client() -> docker.DockerClient:
     return docker_client
 
 
-def is_container_running(name: str) -> bool:
-    """Check if container is currently running"""
-    try:
-        client = get_docker_client()
-        container = client.containers.get(name)
-        return container.status == "running"
-    except docker.errors.NotFound:
-        return False
-    except Exception as e:
-        logger.error(f"Error checking container status: {str(e)}")
-        return False
-
+async def inspect_container(name: str):
+    """Fetch a container by name with a single Docker inspect (None if missing)
 
-def is_container_stopped(name: str) -> bool:
-    """Check if container exists but is stopped"""
+    Runs in a worker thread: the Docker SDK is synchronous and would
+    otherwise block the event loop for the whole daemon round-trip.
+    """
     try:
         client = get_docker_client()
-        container = client.containers.get(name)
-        return container.status != "running"
+        return await asyncio.to_thread(client.containers.get, name)
     except docker.errors.NotFound:
-        return False
+        return None
     except Exception as e:
-        logger.error(f"Error checking container status: {str(e)}")
-        return False
+        logger.error(f"Error inspecting container {name}: {str(e)}")
+        return None
 
 
-def start_existing_container(name: str) -> bool:
-    """Start a stopped container"""
-    try:
-        client = get_docker_client()
-        container = client.containers.get(name)
-        if container.status != "running":
-            logger.info(f"Starting existing container: {name}")
-            container.start()
-            # Wait a moment for container to be ready
-            return True
-        return True
-    except Exception as e:
-        logger.error(f"Error starting container {name}: {str(e)}")
-        return False
+async def ensure_image_pulled(client: docker.DockerClient) -> None:
+    """Pull the container image, coalescing concurrent cold-starts into one pull"""
+    async with image_pull_lock:
+        # Another cold-start may have finished the pull while we waited
+        try:
+            await asyncio.to_thread(client.images.get, CONTAINER_IMAGE)
+            return
+        except docker.errors.ImageNotFound:
+            pass
+        logger.info(f"Pulling image: {CONTAINER_IMAGE}")
+        await asyncio.to_thread(client.images.pull, CONTAINER_IMAGE)
 
 
-def create_container(api_key: str, port: int) -> Optional[str]:
+async def create_container(api_key: str, port: int) -> Optional[str]:
     """Create a new Docker container for the user"""
     container_name = hash_api_key(api_key)
 
     try:
         client = get_docker_client()
 
-        # Pull image if needed (silently)
-        try:
-            logger.info(f"Pulling image: {CONTAINER_IMAGE}")
-            client.images.pull(CONTAINER_IMAGE)
-        except Exception as e:
-            logger.warning(f"Could not pull image: {str(e)}")
-
         # Create container
         logger.info(f"Creating container: {container_name} on port {port}")
 
-        container = client.containers.create(
-            CONTAINER_IMAGE,
-            name=container_name,
-            ports={"3000/tcp": port},
-            environment={
-                "OUTLINE_API_KEY": api_key,
-                "OUTLINE_API_URL": "https://app.getoutline.com",
-                "MCP_TRANSPORT": "streamable-http",
-                "MCP_HOST": "0.0.0.0",
-                "MCP_PORT": "3000",
-            },
-            mem_limit=CONTAINER_MEMORY,
-            memswap_limit=CONTAINER_MEMORY,
-            nano_cpus=int(float(CONTAINER_CPU) * 1e9),
-            restart_policy={"Name": "unless-stopped"},
-            network_mode="bridge",
-        )
+        def _create():
+            return client.containers.create(
+                CONTAINER_IMAGE,
+                name=container_name,
+                ports={"3000/tcp": port},
+                environment={
+                    "OUTLINE_API_KEY": api_key,
+                    "OUTLINE_API_URL": "https://app.getoutline.com",
+                    "MCP_TRANSPORT": "streamable-http",
+                    "MCP_HOST": "0.0.0.0",
+                    "MCP_PORT": "3000",
+                },
+                mem_limit=CONTAINER_MEMORY,
+                memswap_limit=CONTAINER_MEMORY,
+                nano_cpus=int(float(CONTAINER_CPU) * 1e9),
+                restart_policy={"Name": "unless-stopped"},
+                network_mode="bridge",
+            )
+
+        try:
+            container = await asyncio.to_thread(_create)
+        except docker.errors.ImageNotFound:
+            # Pull lazily only when the image isn't local yet, then retry once
+            await ensure_image_pulled(client)
+            container = await asyncio.to_thread(_create)
 
         # Start the container
-        container.start()
+        await asyncio.to_thread(container.start)
         logger.info(f"Container started: {container_name}")
         return container_name
 
@@ -283,11 +431,11 @@ def create_container(api_key: str, port: int) -> Optional[str]:
         return None
 
 
-def get_container_info(name: str) -> Optional[Dict]:
+async def get_container_info(name: str) -> Optional[Dict]:
     """Get detailed info about a container"""
     try:
         client = get_docker_client()
-        container = client.containers.get(name)
+        container = await asyncio.to_thread(client.containers.get, name)
 
         return {
             "name": container.name,
@@ -305,129 +453,159 @@ def get_container_info(name: str) -> Optional[Dict]:
 # MAIN PROXY LOGIC
 # ============================================================================
 
+async def wait_for_container_ready(port: int, timeout: float = 5.0) -> None:
+    """Probe the container with HTTP requests until the MCP server answers
+
+    Replaces fixed warm-up sleeps: returns as soon as the server responds
+    (often ~150ms) instead of always waiting 1-2 seconds. A bare TCP
+    connect is not enough here: Docker's port proxy accepts connections
+    as soon as the container starts, before the process inside listens.
+    """
+    url = f"http://localhost:{port}/"
+    deadline = time() + timeout
+    delay = 0.025
+    while time() < deadline:
+        try:
+            # Any HTTP response (even 404) means the server is up
+            await proxy_client.get(url, timeout=httpx.Timeout(1.0))
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.25)
+    logger.warning(f"Container on port {port} not responding after {timeout}s")
+
+
+def check_registry_fast_path(api_key_hash: str) -> Optional[Tuple[int, str]]:
+    """Return (port, name) when 'running' was confirmed within STATUS_CACHE_TTL
+
+    Bursts of MCP calls from the same user hit this and skip Docker entirely.
+    """
+    info = container_registry.get(api_key_hash)
+    if (
+        info is not None
+        and info.status == "running"
+        and time() - info.status_checked_at < STATUS_CACHE_TTL
+    ):
+        info.last_used = time()
+        return info.port, info.container_name
+    return None
+
+
 async def create_or_start_container(api_key: str) -> Tuple[int, str]:
     """
     Main logic: Get or create container for user
     Returns: (port, container_name)
+
+    Concurrent requests for the same key serialize on a per-key lock so a
+    cold start happens exactly once (singleflight); later waiters return
+    from the registry fast path without touching Docker.
     """
     api_key_hash = hash_api_key(api_key)
-    container_name = hash_api_key(api_key)  # Deterministic name
-
-    # Case 1: Container already tracked in registry
-    if api_key_hash in container_registry:
-        info = container_registry[api_key_hash]
-        logger.info(f"Found existing container in registry: {info.container_name}")
-
-        # Case 1a: Container is running
-        if is_container_running(info.container_name):
-            info.last_used = time()
-            logger.debug(f"Container already running: {info.container_name}")
-            return info.port, info.container_name
-
-        # Case 1b: Container is stopped, restart it
-        if is_container_stopped(info.container_name):
-            logger.info(f"Restarting stopped container: {info.container_name}")
-            if start_existing_container(info.container_name):
-                info.last_used = time()
-                info.status = "running"
-                await asyncio.sleep(1)  # Give container time to start
-                return info.port, info.container_name
-            else:
-                logger.error(f"Failed to restart container: {info.container_name}")
-                # Fall through to create new one
-                del container_registry[api_key_hash]
-
-    # Case 2: Container exists on disk but not in registry (e.g., after proxy restart)
-    if is_container_stopped(container_name):
-        logger.info(f"Found stopped container on disk (not in registry): {container_name}")
-        # Try to get port from existing container
+
+    result = check_registry_fast_path(api_key_hash)
+    if result is not None:
+        return result
+
+    async with container_locks[api_key_hash]:
+        # Re-check under the lock: the first waiter may have done the work
+        result = check_registry_fast_path(api_key_hash)
+        if result is not None:
+            return result
+        return await provision_container(api_key, api_key_hash)
+
+
+async def provision_container(api_key: str, api_key_hash: str) -> Tuple[int, str]:
+    """
+    Inspect/restart/create the container for a key (runs under the per-key lock)
+
+    Issues a single Docker inspect and dispatches on its status instead of
+    separate running/stopped probes per branch.
+    """
+    container_name = api_key_hash  # Deterministic name, same hash
+
+    info = container_registry.get(api_key_hash)
+    container = await inspect_container(container_name)
+
+    # Case 1: Container exists on disk (running or stopped, tracked or not)
+    if container is not None:
+        was_stopped = container.status != "running"
         try:
-            client = get_docker_client()
-            container = client.containers.get(container_name)
-            port_bindings = container.ports
-
-            # Extract port from binding like {'3000/tcp': [{'HostPort': '4000', ...}]}
-            # Only proceed if ports are correctly bound
-            if port_bindings and '3000/tcp' in port_bindings:
-                port = int(port_bindings['3000/tcp'][0]['HostPort'])
-                # Mark port as allocated
+            # Prefer the registry's port; fall back to the container's own
+            # bindings when recovering after a proxy restart
+            port = info.port if info is not None else None
+            if port is None:
+                port_bindings = container.ports
+                # Binding looks like {'3000/tcp': [{'HostPort': '4000', ...}]}
+                if port_bindings and '3000/tcp' in port_bindings:
+                    port = int(port_bindings['3000/tcp'][0]['HostPort'])
+
+            if port is None:
+                logger.warning(
+                    f"Container {container_name} exists but has no valid port bindings, removing it"
+                )
+                await asyncio.to_thread(container.remove, force=True)
+                drop_registry_entry(api_key_hash)
+            else:
                 allocated_ports.add(port)
 
-                # Restart container
-                if start_existing_container(container_name):
-                    container_registry[api_key_hash] = ContainerInfo(
+                if was_stopped:
+                    logger.info(f"Starting existing container: {container_name}")
+                    await asyncio.to_thread(container.start)
+
+                if info is None:
+                    register_container(ContainerInfo(
                         container_name=container_name,
                         api_key_hash=api_key_hash,
                         port=port,
                         last_used=time(),
                         created_at=time(),
-                        status="running"
-                    )
-                    logger.info(f"Restarted container from disk: {container_name} on port {port}")
-                    await asyncio.sleep(1)
-                    return port, container_name
-            else:
-                logger.warning(f"Container {container_name} exists but has no valid port bindings, removing it")
-                container.remove(force=True)
+                        status="running",
+                        status_checked_at=time()
+                    ))
+                    logger.info(f"Recovered container to registry: {container_name} on port {port}")
+                else:
+                    info.last_used = time()
+                    mark_status(info, "running")
+
+                if was_stopped:
+                    await wait_for_container_ready(port)
+                return port, container_name
         except Exception as e:
             logger.warning(f"Could not reuse existing container: {str(e)}, removing it")
             try:
-                client = get_docker_client()
-                container = client.containers.get(container_name)
-                container.remove(force=True)
-            except:
+                await asyncio.to_thread(container.remove, force=True)
+            except Exception:
                 pass
+            drop_registry_entry(api_key_hash)
             # Fall through to create new one
 
-    if is_container_running(container_name):
-        logger.info(f"Found running container on disk (not in registry): {container_name}")
-        # Container is somehow running but not in registry, try to add it back
-        try:
-            client = get_docker_client()
-            container = client.containers.get(container_name)
-            port_bindings = container.ports
-
-            # Only proceed if ports are correctly bound
-            if port_bindings and '3000/tcp' in port_bindings:
-                port = int(port_bindings['3000/tcp'][0]['HostPort'])
-                allocated_ports.add(port)
-
-                container_registry[api_key_hash] = ContainerInfo(
-                    container_name=container_name,
-                    api_key_hash=api_key_hash,
-                    port=port,
-                    last_used=time(),
-                    created_at=time(),
-                    status="running"
-                )
-                logger.info(f"Recovered running container to registry: {container_name} on port {port}")
-                return port, container_name
-            else:
-                logger.warning(f"Container {container_name} is running but has no valid port bindings, stopping it")
-                container.stop()
-        except Exception as e:
-            logger.warning(f"Could not recover running container: {str(e)}")
-
-    # Case 3: Container doesn't exist anywhere, create new one
+    # Case 2: Container doesn't exist anywhere, create new one
+    # Drop any stale registry entry first (container removed behind our back):
+    # otherwise register_container overwrites it, leaking its port from the
+    # pool and double-counting it if the stale status was "running"
+    drop_registry_entry(api_key_hash)
     logger.info(f"Creating new container for API key hash: {api_key_hash}")
     port = get_next_available_port()
 
-    created_name = create_container(api_key, port)
+    created_name = await create_container(api_key, port)
     if not created_name:
+        # Nothing holds the port now; give it back or it's lost until restart
+        release_port(port)
         raise RuntimeError("Failed to create container")
 
     # Wait for container to be ready
-    await asyncio.sleep(2)
+    await wait_for_container_ready(port)
 
     # Register in memory
-    container_registry[api_key_hash] = ContainerInfo(
+    register_container(ContainerInfo(
         container_name=created_name,
         api_key_hash=api_key_hash,
         port=port,
         last_used=time(),
         created_at=time(),
-        status="running"
-    )
+        status="running",
+        status_checked_at=time()
+    ))
 
     logger.info(f"Container ready: {created_name} on port {port}")
     return port, created_name
@@ -448,76 +626,71 @@ async def proxy_request(
     api_key_hash = hash_api_key(api_key)
 
     try:
-        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-            # Build headers for proxy request
-            proxy_headers = {}
-
-            # Copy relevant headers from original request, but be selective
-            headers_to_forward = ["content-type", "user-agent", "cache-control"]
-            for header_name in headers_to_forward:
-                if header_name in request.headers:
-                    proxy_headers[header_name] = request.headers[header_name]
-
-            # Always set Accept header for MCP streamable-http protocol
-            # This ensures proper Server-Sent Events response
-            proxy_headers["accept"] = "application/json, text/event-stream"
-
-            # Session Pooling: Add stored session ID if available
-            # This maintains MCP HTTP session state across multiple requests
-            stored_session = get_mcp_session(api_key_hash)
-            if stored_session:
-                proxy_headers["mcp-session-id"] = stored_session
-                logger.debug(f"Using pooled session for {api_key_hash}: {stored_session}")
-
-            # Read body if present
-            body = b""
-            if request.method in ["POST", "PUT", "PATCH"]:
-                body = await request.body()
-
-            # Make the request with streaming enabled
-            response = await client.request(
-                method=request.method,
-                url=url,
-                headers=proxy_headers,
-                content=body,
-            )
-
-            # Always stream the response for MCP compatibility
-            # This ensures proper handling of Server-Sent Events
-            async def stream_generator():
-                async for chunk in response.aiter_bytes(chunk_size=8192):
-                    if chunk:
-                        yield chunk
-
-            # Prepare response headers, ensuring proper SSE headers and no duplicates
-            response_headers = {}
-
-            # Copy important headers from backend response
-            # These headers are critical for MCP HTTP protocol
-            headers_to_preserve = [
-                "content-type",
-                "cache-control",
-                "mcp-session-id",
-                "x-accel-buffering",
-                "connection",
-            ]
-
-            for header_name in headers_to_preserve:
-                if header_name in response.headers:
-                    response_headers[header_name] = response.headers[header_name]
-
-            # Session Pooling: Extract and store session ID from response
-            # MCP server returns session ID in response headers for stateful protocol
-            if "mcp-session-id" in response.headers:
-                new_session_id = response.headers["mcp-session-id"]
-                save_mcp_session(api_key_hash, new_session_id)
-                logger.info(f"Pooled new MCP session for {api_key_hash}: {new_session_id}")
-
-            return StreamingResponse(
-                stream_generator(),
-                status_code=response.status_code,
-                headers=response_headers,
-            )
+        # Build headers in a single pass over the raw ASGI header list instead
+        # of per-name lookups through Starlette's case-insensitive mapping
+        proxy_headers = [
+            (name, value)
+            for name, value in request.headers.raw
+            if name in FORWARDED_REQUEST_HEADERS
+        ]
+        proxy_headers.append(ACCEPT_HEADER)
+        proxy_headers.append(ACCEPT_ENCODING_HEADER)
+
+        # Session Pooling: Add stored session ID if available
+        # This maintains MCP HTTP session state across multiple requests
+        stored_session = get_mcp_session(api_key_hash)
+        if stored_session:
+            proxy_headers.append((b"mcp-session-id", stored_session.encode()))
+            logger.debug(f"Using pooled session for {api_key_hash}: {stored_session}")
+
+        # Stream the request body upward instead of materializing it in memory
+        body = request.stream() if request.method in ["POST", "PUT", "PATCH"] else None
+
+        # Send the request with response streaming enabled so bytes flow
+        # downstream as they arrive - critical for MCP Server-Sent Events
+        proxy_req = proxy_client.build_request(
+            method=request.method,
+            url=url,
+            headers=proxy_headers,
+            content=body,
+        )
+        response = await proxy_client.send(proxy_req, stream=True)
+
+        # Prepare response headers, ensuring proper SSE headers and no duplicates
+        response_headers = {}
+
+        # Copy important headers from backend response
+        # These headers are critical for MCP HTTP protocol
+        headers_to_preserve = [
+            "content-type",
+            # Bytes are forwarded undecoded, so framing/encoding headers must
+            # travel with them in case the backend compresses despite
+            # accept-encoding: identity
+            "content-encoding",
+            "content-length",
+            "cache-control",
+            "mcp-session-id",
+            "x-accel-buffering",
+            "connection",
+        ]
+
+        for header_name in headers_to_preserve:
+            if header_name in response.headers:
+                response_headers[header_name] = response.headers[header_name]
+
+        # Session Pooling: Extract and store session ID from response
+        # MCP server returns session ID in response headers for stateful protocol
+        if "mcp-session-id" in response.headers:
+            new_session_id = response.headers["mcp-session-id"]
+            save_mcp_session(api_key_hash, new_session_id)
+            logger.info(f"Pooled new MCP session for {api_key_hash}: {new_session_id}")
+
+        return StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            headers=response_headers,
+            background=BackgroundTask(response.aclose),
+        )
 
     except httpx.TimeoutException:
         logger.error(f"Timeout proxying request to {url}")
@@ -533,6 +706,74 @@ async def proxy_request(
 # BACKGROUND CLEANUP TASK
 # ============================================================================
 
+async def stop_idle_container(info: ContainerInfo, idle_minutes: float) -> None:
+    """Stop one idle container directly, without an inspect round-trip first"""
+    logger.info(
+        f"Stopping idle container {info.container_name} "
+        f"(idle for {idle_minutes:.1f} minutes)"
+    )
+    try:
+        client = get_docker_client()
+        # Low-level stop skips the containers.get the high-level API needs
+        await asyncio.to_thread(client.api.stop, info.container_name, timeout=10)
+    except docker.errors.NotFound:
+        logger.warning(f"Container already gone: {info.container_name}")
+    except docker.errors.APIError as e:
+        logger.error(f"Error stopping container: {str(e)}")
+    mark_status(info, "stopped")
+
+
+async def watch_container_events():
+    """
+    Background task: keep registry statuses synced from Docker's push-based
+    event stream (start/stop/die) instead of polling the daemon
+    """
+    global docker_events
+
+    while True:
+        try:
+            if docker_events is None:
+                client = get_docker_client()
+                docker_events = client.events(decode=True, filters={"type": "container"})
+
+            event = await asyncio.to_thread(next, docker_events, None)
+            if event is None:
+                if events_shutdown:
+                    break
+                # Stream ended without shutdown (daemon went away): reconnect
+                logger.warning("Docker event stream ended, reconnecting")
+                docker_events = None
+                await asyncio.sleep(5)
+                continue
+
+            status = event.get("status")
+            if status not in ("start", "stop", "die"):
+                continue
+
+            # Container names are the registry keys (both are hash_api_key output)
+            name = event.get("Actor", {}).get("Attributes", {}).get("name", "")
+            info = container_registry.get(name)
+            if info is None:
+                continue
+
+            mark_status(info, "running" if status == "start" else "stopped")
+            logger.debug(f"Docker event '{status}' for {name}")
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in Docker events listener: {str(e)}")
+            # A generator that raised is finished: next() would just return
+            # the default forever. Drop it so the next pass opens a fresh stream.
+            if docker_events is not None:
+                try:
+                    docker_events.close()
+                except Exception:
+                    pass
+                docker_events = None
+            await asyncio.sleep(5)
+
+
 async def cleanup_idle_containers():
     """
     Background task: Stop containers idle for > 15 minutes
@@ -544,36 +785,32 @@ async def cleanup_idle_containers():
             await asyncio.sleep(60)
 
             current_time = time()
-            idle_keys = []
 
-            # Cleanup idle containers
-            for api_key_hash, info in container_registry.items():
+            # Collect idle running containers, then stop them in parallel.
+            # Snapshot the registry first: request handlers add/remove entries
+            # concurrently and a live dict view can raise mid-iteration
+            idle_infos = []
+            for info in list(container_registry.values()):
                 idle_duration = current_time - info.last_used
-                idle_minutes = idle_duration / 60
-
-                if idle_duration > IDLE_TIMEOUT_SECONDS:
-                    logger.info(
-                        f"Stopping idle container {info.container_name} "
-                        f"(idle for {idle_minutes:.1f} minutes)"
-                    )
+                if idle_duration > IDLE_TIMEOUT_SECONDS and info.status == "running":
+                    idle_infos.append((info, idle_duration / 60))
 
-                    try:
-                        client = get_docker_client()
-                        container = client.containers.get(info.container_name)
-                        container.stop()
-                        info.status = "stopped"
-                    except Exception as e:
-                        logger.error(f"Error stopping container: {str(e)}")
-
-                    idle_keys.append(api_key_hash)
-
-            # Update registry
-            for key in idle_keys:
-                container_registry[key].status = "stopped"
+            if idle_infos:
+                await asyncio.gather(
+                    *(stop_idle_container(info, minutes) for info, minutes in idle_infos)
+                )
 
             # Cleanup expired MCP sessions
             cleanup_expired_sessions()
 
+            # Drop per-key container locks whose registry entries are gone
+            for key in list(container_locks.keys()):
+                if key not in container_registry and not container_locks[key].locked():
+                    del container_locks[key]
+
+            # Cleanup expired API key validations
+            cleanup_expired_validations()
+
         except Exception as e:
             logger.error(f"Error in cleanup task: {str(e)}")
 
@@ -585,21 +822,42 @@ async def cleanup_idle_containers():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle app startup and shutdown"""
-    global cleanup_task
+    global cleanup_task, events_task, events_shutdown, outline_client, proxy_client
 
     # Startup
     logger.info("Starting Outline MCP Proxy Server")
+
+    # Shared pooled HTTP clients: one for Outline API validation (keep-alive +
+    # HTTP/2 multiplexing to app.getoutline.com), one for proxying to containers
+    outline_client = httpx.AsyncClient(
+        timeout=10,
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=200),
+        http2=True,
+    )
+    proxy_client = httpx.AsyncClient(
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(max_keepalive_connections=200, max_connections=1000),
+    )
+
     try:
         client = get_docker_client()
-        client.ping()
+        await asyncio.to_thread(client.ping)
         logger.info("Docker connection successful")
     except Exception as e:
         logger.error(f"Failed to connect to Docker: {str(e)}")
 
+    # Recover port allocations from containers that survived a proxy restart
+    await bootstrap_allocated_ports()
+    initialize_port_pool()
+
     # Start cleanup task
     cleanup_task = asyncio.create_task(cleanup_idle_containers())
     logger.info("Cleanup task started")
 
+    # Start Docker events listener
+    events_task = asyncio.create_task(watch_container_events())
+    logger.info("Docker events listener started")
+
     yield
 
     # Shutdown
@@ -611,6 +869,20 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError:
             pass
 
+    if events_task:
+        events_shutdown = True
+        events_task.cancel()
+        if docker_events is not None:
+            # Unblocks the worker thread waiting on the event stream
+            docker_events.close()
+        try:
+            await events_task
+        except asyncio.CancelledError:
+            pass
+
+    await outline_client.aclose()
+    await proxy_client.aclose()
+
 
 app = FastAPI(
     title="Outline MCP Proxy",
@@ -625,29 +897,38 @@ app = FastAPI(
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    running_count = sum(
-        1 for info in container_registry.values()
-        if info.status == "running"
-    )
+    """Health check endpoint (O(1): served from maintained counters)"""
     return {
         "status": "healthy",
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": iso_now(),
         "containers_tracked": len(container_registry),
-        "containers_running": running_count,
+        "containers_running": running_containers,
     }
 
 
 @app.get("/stats")
-async def get_stats(authorization: Optional[str] = Header(None)):
+async def get_stats(detailed: bool = False, authorization: Optional[str] = Header(None)):
     """
     Get detailed statistics (requires auth)
     Note: Nginx will handle basic auth, but we can add extra checks here
+
+    Served from the in-memory registry with zero Docker calls; pass
+    ?detailed=1 to include live inspect data (fetched concurrently)
     """
+    entries = list(container_registry.items())
+
+    container_infos: Dict[str, Optional[Dict]] = {}
+    if detailed and entries:
+        results = await asyncio.gather(
+            *(get_container_info(info.container_name) for _, info in entries)
+        )
+        container_infos = {
+            info.container_name: result for (_, info), result in zip(entries, results)
+        }
+
     stats = []
 
-    for api_key_hash, info in container_registry.items():
-        container_info = get_container_info(info.container_name)
+    for api_key_hash, info in entries:
         idle_seconds = time() - info.last_used
 
         stats.append({
@@ -659,11 +940,11 @@ async def get_stats(authorization: Optional[str] = Header(None)):
             "last_used": datetime.fromtimestamp(info.last_used, tz=timezone.utc).isoformat(),
             "idle_seconds": int(idle_seconds),
             "idle_minutes": round(idle_seconds / 60, 1),
-            "container_info": container_info,
+            "container_info": container_infos.get(info.container_name),
         })
 
     return {
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": iso_now(),
         "total_containers": len(container_registry),
         "running_count": sum(1 for s in stats if s["status"] == "running"),
         "stopped_count": sum(1 for s in stats if s["status"] == "stopped"),
@@ -671,18 +952,12 @@ async def get_stats(authorization: Optional[str] = Header(None)):
     }
 
 
-@app.post("/mcp")
-@app.post("/")
-@app.get("/mcp")
-@app.get("/")
-async def mcp_http_endpoint(
-    request: Request,
+async def ensured_container(
     x_outline_api_key: Optional[str] = Header(None),
-):
+) -> Tuple[int, str, str]:
     """
-    MCP HTTP Protocol endpoint
-    Handles JSON-RPC requests from Claude Code or other MCP clients
-    Both /mcp and / paths are supported for both GET and POST
+    Shared dependency: validate the API key and ensure its container is up
+    Returns: (port, container_name, api_key)
     """
     # Step 1: Validate API key header
     if not x_outline_api_key:
@@ -690,56 +965,56 @@ async def mcp_http_endpoint(
         raise HTTPException(status_code=400, detail="Missing X-Outline-API-Key header")
 
     # Step 2: Validate against Outline
-    logger.debug(f"Validating API key")
+    logger.debug("Validating API key")
     is_valid = await validate_outline_key(x_outline_api_key)
     if not is_valid:
-        logger.warning(f"Invalid API key")
+        logger.warning("Invalid API key")
         raise HTTPException(status_code=401, detail="Invalid API key")
 
     # Step 3: Get or create container
     try:
         port, container_name = await create_or_start_container(x_outline_api_key)
-        logger.info(f"MCP request routed to {container_name} on port {port}")
     except Exception as e:
         logger.error(f"Failed to get/create container: {str(e)}")
         raise HTTPException(status_code=503, detail="Container service unavailable")
 
-    # Step 4: Proxy request to container (/mcp endpoint on container)
-    return await proxy_request(port, "mcp", request, x_outline_api_key)
+    return port, container_name, x_outline_api_key
+
+
+@app.post("/mcp")
+@app.post("/")
+@app.get("/mcp")
+@app.get("/")
+async def mcp_http_endpoint(
+    request: Request,
+    container: Tuple[int, str, str] = Depends(ensured_container),
+):
+    """
+    MCP HTTP Protocol endpoint
+    Handles JSON-RPC requests from Claude Code or other MCP clients
+    Both /mcp and / paths are supported for both GET and POST
+    """
+    port, container_name, api_key = container
+    logger.info(f"MCP request routed to {container_name} on port {port}")
+
+    # Proxy request to container (/mcp endpoint on container)
+    return await proxy_request(port, "mcp", request, api_key)
 
 
 @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"])
 async def proxy(
     path: str,
     request: Request,
-    x_outline_api_key: Optional[str] = Header(None),
+    container: Tuple[int, str, str] = Depends(ensured_container),
 ):
     """
     Legacy proxy endpoint
     Routes requests to per-user containers
     """
-    # Step 1: Validate API key header
-    if not x_outline_api_key:
-        logger.warning("Request missing X-Outline-API-Key header")
-        raise HTTPException(status_code=400, detail="Missing X-Outline-API-Key header")
-
-    # Step 2: Validate against Outline
-    logger.debug(f"Validating API key")
-    is_valid = await validate_outline_key(x_outline_api_key)
-    if not is_valid:
-        logger.warning(f"Invalid API key")
-        raise HTTPException(status_code=401, detail="Invalid API key")
-
-    # Step 3: Get or create container
-    try:
-        port, container_name = await create_or_start_container(x_outline_api_key)
-        logger.info(f"Request routed to {container_name} on port {port}")
-    except Exception as e:
-        logger.error(f"Failed to get/create container: {str(e)}")
-        raise HTTPException(status_code=503, detail="Container service unavailable")
+    port, container_name, api_key = container
+    logger.info(f"Request routed to {container_name} on port {port}")
 
-    # Step 4: Proxy request
-    return await proxy_request(port, path, request, x_outline_api_key)
+    return await proxy_request(port, path, request, api_key)
 
 
 # ============================================================================
@@ -755,7 +1030,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         content={
             "error": exc.detail,
             "status_code": exc.status_code,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": iso_now(),
         }
     )
 
@@ -771,4 +1046,10 @@ if __name__ == "__main__":
         port=8000,
         reload=False,
         log_level="info",
+        # uvloop + httptools (bundled with uvicorn[standard]) cut per-request
+        # event-loop and HTTP-parsing overhead versus the stdlib loop + h11.
+        # Keep a single worker: the container registry and port allocator are
+        # in-process state and must stay the sole allocator.
+        loop="uvloop",
+        http="httptools",
     )
@@ -0,0 +1,441 @@
+"""
+Outline MCP Stdio Bridge
+Exposes the MCP server over TCP (port 9000) speaking line-delimited JSON-RPC,
+forwarding requests to the FastAPI proxy on localhost:8000
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+from collections import OrderedDict
+from functools import lru_cache
+from time import time
+
+import httpx
+import orjson
+
+# ============================================================================
+# LOGGING CONFIGURATION
+# ============================================================================
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+BRIDGE_HOST = "0.0.0.0"
+BRIDGE_PORT = 9000
+HTTP_PROXY_URL = "http://localhost:8000"
+REQUEST_TIMEOUT = 90  # seconds
+WRITE_HIGH_WATER = 64 * 1024  # only await drain once this much output is buffered
+MAX_LINE_BYTES = 256 * 1024  # largest JSON-RPC line accepted from a client
+READ_CHUNK = 64 * 1024  # socket read size for the framing loop
+OUTLINE_API_KEY = os.environ.get("OUTLINE_API_KEY", "")
+
+PROTOCOL_VERSION = "2024-11-05"
+SERVER_INFO = {"name": "Outline MCP Stdio Bridge", "version": "1.0.0"}
+
+# The initialize response is constant except for the request id, so serialize
+# it once at import; per call only the id is patched in
+INIT_RESULT = {
+    "protocolVersion": PROTOCOL_VERSION,
+    "capabilities": {"resources": {"subscribe": False}},
+    "serverInfo": SERVER_INFO,
+}
+INIT_PREFIX = b'{"jsonrpc":"2.0","result":' + orjson.dumps(INIT_RESULT) + b',"id":'
+
+# Every error response shares this shape; formatting into the template only
+# serializes the two variable fields instead of a fresh dict each time
+_ERR_TMPL = b'{"jsonrpc":"2.0","error":{"code":%d,"message":%b},"id":%b}'
+
+
+def err_bytes(code: int, message: str, request_id=None) -> bytes:
+    """Serialized JSON-RPC error envelope"""
+    return _ERR_TMPL % (code, orjson.dumps(message), orjson.dumps(request_id))
+
+# ============================================================================
+# GLOBAL STATE
+# ============================================================================
+
+# Long-lived pooled HTTP clients, one per API key: each key gets its own
+# keep-alive pool so one tenant's burst can't evict another's warm
+# connections. LRU-bounded; evicted clients close in the background.
+MAX_CLIENTS = 32
+_CLIENTS: "OrderedDict[str, httpx.AsyncClient]" = OrderedDict()
+# References to background close tasks; the loop only holds weak ones, so an
+# unreferenced task can be garbage-collected before it ever runs
+_CLOSE_TASKS: set = set()
+
+
+def get_http_client(api_key: str) -> httpx.AsyncClient:
+    """Pooled client for this API key, creating and LRU-evicting as needed"""
+    client = _CLIENTS.get(api_key)
+    if client is not None:
+        _CLIENTS.move_to_end(api_key)
+        return client
+
+    client = httpx.AsyncClient(
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(max_keepalive_connections=10, max_connections=50),
+    )
+    _CLIENTS[api_key] = client
+    if len(_CLIENTS) > MAX_CLIENTS:
+        _, evicted = _CLIENTS.popitem(last=False)
+        # Close off the caller's path; note aclose() tears the pool down and
+        # fails anything still in flight on the evicted client - acceptable
+        # for the least-recently-used key, whose requests have long finished
+        task = asyncio.create_task(evicted.aclose())
+        _CLOSE_TASKS.add(task)
+        task.add_done_callback(_CLOSE_TASKS.discard)
+    return client
+
+
+async def close_http_clients() -> None:
+    """Shutdown: close every pooled client"""
+    clients = list(_CLIENTS.values())
+    _CLIENTS.clear()
+    await asyncio.gather(*(c.aclose() for c in clients), return_exceptions=True)
+
+# documents.info cache: (api_key_hash, doc_id) -> (expiry, serialized result bytes)
+# Outline documents change rarely; repeat reads skip both the HTTP round-trip
+# and the response re-encoding
+DOC_CACHE_TTL = 60  # seconds
+DOC_CACHE_MAX = 512
+doc_cache: dict = {}
+
+
+@lru_cache(maxsize=64)
+def cache_key_hash(api_key: str) -> str:
+    """Short hash so raw API keys never sit in the cache keys"""
+    return hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest()
+
+
+# Parse the proxy URLs once at import; passing a str to the client re-parses
+# and re-validates it on every single request
+LIST_URL = httpx.URL(f"{HTTP_PROXY_URL}/api/documents.list")
+INFO_URL = httpx.URL(f"{HTTP_PROXY_URL}/api/documents.info")
+
+
+@lru_cache(maxsize=128)
+def outline_url(endpoint: str) -> httpx.URL:
+    """Parsed-URL cache for the outline/* passthrough endpoints"""
+    return httpx.URL(f"{HTTP_PROXY_URL}/api{endpoint}")
+
+# ============================================================================
+# MCP HANDLER
+# ============================================================================
+
+class MCPStdioHandler:
+    """Handles one TCP client speaking line-delimited JSON-RPC (MCP stdio)"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.api_key = OUTLINE_API_KEY  # setter also builds the cached headers
+        # Requests run as concurrent tasks; only the line-framed writes serialize
+        self.write_lock = asyncio.Lock()
+        self.tasks: set = set()
+        # Flat dict dispatch instead of chained string comparisons per message
+        self.dispatch_table = {
+            "initialize": self.handle_initialize,
+            "resources/list": self.handle_list_resources,
+            "resources/read": self.handle_read_resource,
+            "notifications/initialized": self.handle_initialized_notification,
+        }
+
+    @property
+    def api_key(self):
+        return self._api_key
+
+    @api_key.setter
+    def api_key(self, value):
+        # Rebuild the cached header dict only when the key actually changes;
+        # every handler shares it instead of allocating one per request
+        self._api_key = value
+        self._headers = {"X-Outline-API-Key": value} if value else {}
+
+    async def handle_initialize(self, request_id, params):
+        """MCP initialize handshake (cached bytes, only the id is serialized)"""
+        return INIT_PREFIX + orjson.dumps(request_id) + b"}"
+
+    async def handle_initialized_notification(self, request_id, params):
+        """Notification: no response expected"""
+        return None
+
+    async def handle_list_resources(self, request_id, params):
+        """resources/list - list Outline documents as MCP resources"""
+        try:
+            client = get_http_client(self.api_key)
+            request = client.build_request("GET", LIST_URL, headers=self._headers)
+            response = await client.send(request)
+
+            if response.status_code != 200:
+                return err_bytes(-32000, f"Proxy returned {response.status_code}", request_id)
+
+            documents = response.json().get("data", [])
+
+            # Serialize each resource straight into the output buffer: one
+            # pass, no intermediate list of dicts doubling peak memory
+            buf = bytearray(b'{"jsonrpc":"2.0","result":{"resources":[')
+            for i, doc in enumerate(documents):
+                if i:
+                    buf += b","
+                buf += orjson.dumps({
+                    "uri": f"outline://document/{doc.get('id', i)}",
+                    "name": doc.get("title", "Untitled"),
+                    "mimeType": "text/plain",
+                })
+            buf += b']},"id":' + orjson.dumps(request_id) + b"}"
+            return bytes(buf)
+        except httpx.HTTPError as e:
+            logger.error(f"Error listing resources: {str(e)}")
+            return err_bytes(-32000, f"Proxy error: {str(e)}", request_id)
+
+    async def handle_read_resource(self, request_id, params):
+        """resources/read - fetch one Outline document's content"""
+        uri = params.get("uri", "")
+        # removeprefix only strips the scheme prefix; replace() would also
+        # scan the rest of the string and mangle any later occurrence
+        doc_id = uri.removeprefix("outline://document/")
+
+        cache_key = (cache_key_hash(self.api_key), doc_id)
+        cached = doc_cache.get(cache_key)
+        if cached is not None and cached[0] > time():
+            return (
+                b'{"jsonrpc":"2.0","result":' + cached[1]
+                + b',"id":' + orjson.dumps(request_id) + b"}"
+            )
+
+        try:
+            client = get_http_client(self.api_key)
+            request = client.build_request(
+                "GET", INFO_URL, params={"id": doc_id}, headers=self._headers
+            )
+            response = await client.send(request)
+
+            if response.status_code != 200:
+                return err_bytes(-32000, f"Proxy returned {response.status_code}", request_id)
+
+            document = response.json().get("data", {})
+            result_bytes = orjson.dumps({
+                "contents": [
+                    {
+                        "uri": uri,
+                        "mimeType": "text/plain",
+                        "text": document.get("text", ""),
+                    }
+                ]
+            })
+
+            # Cache the serialized result so hits skip re-encoding too
+            if len(doc_cache) >= DOC_CACHE_MAX:
+                doc_cache.pop(next(iter(doc_cache)))
+            doc_cache[cache_key] = (time() + DOC_CACHE_TTL, result_bytes)
+
+            return (
+                b'{"jsonrpc":"2.0","result":' + result_bytes
+                + b',"id":' + orjson.dumps(request_id) + b"}"
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"Error reading resource {uri}: {str(e)}")
+            return err_bytes(-32000, f"Proxy error: {str(e)}", request_id)
+
+    async def handle_outline_request(self, method, params, request_id):
+        """outline/* passthrough - forward to the proxy's Outline API path"""
+        # The dispatcher already verified the "outline/" prefix; slice it off
+        endpoint = "/" + method[len("outline/"):]
+
+        try:
+            client = get_http_client(self.api_key)
+            request = client.build_request(
+                "POST", outline_url(endpoint), json=params or {}, headers=self._headers
+            )
+            response = await client.send(request)
+
+            if response.status_code != 200:
+                return err_bytes(-32000, f"Proxy returned {response.status_code}", request_id)
+
+            # The proxy already returns JSON: embed its bytes straight into the
+            # envelope instead of parsing and re-serializing the whole payload
+            return (
+                b'{"jsonrpc":"2.0","result":' + response.content
+                + b',"id":' + orjson.dumps(request_id) + b"}"
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"Error forwarding {method}: {str(e)}")
+            return err_bytes(-32000, f"Proxy error: {str(e)}", request_id)
+
+    async def handle_message(self, message):
+        """Dispatch one JSON-RPC message to its handler"""
+        method = message.get("method")
+        request_id = message.get("id")
+        params = message.get("params", {})
+
+        handler = self.dispatch_table.get(method)
+        if handler is not None:
+            return await handler(request_id, params)
+        if isinstance(method, str) and method.startswith("outline/"):
+            return await self.handle_outline_request(method, params, request_id)
+        return err_bytes(-32601, f"Method not found: {method}", request_id)
+
+    async def send_response(self, response) -> None:
+        """Write one response line; the lock keeps frames intact across tasks"""
+        # Handlers may return pre-serialized bytes or a dict
+        payload = response if isinstance(response, bytes) else orjson.dumps(response)
+        async with self.write_lock:
+            # Vectorized write: no payload + newline concatenation, and drain
+            # (an event-loop yield + flush) only once the buffer is actually full
+            self.writer.writelines((payload, b"\n"))
+            if self.writer.transport.get_write_buffer_size() > WRITE_HIGH_WATER:
+                await self.writer.drain()
+
+    async def dispatch(self, message) -> None:
+        """Handle one message as its own task so proxy calls can overlap"""
+        try:
+            response = await self.handle_message(message)
+        except Exception as e:
+            logger.error(f"Error handling message: {str(e)}")
+            response = err_bytes(
+                -32603, "Internal error",
+                message.get("id") if isinstance(message, dict) else None,
+            )
+        if response is not None:
+            await self.send_response(response)
+
+    async def _feed_line(self, line) -> None:
+        """Parse one framed line (any bytes-like) and dispatch it as a task"""
+        try:
+            message = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            logger.warning(f"Invalid JSON from client: {str(e)}")
+            await self.send_response(err_bytes(-32700, "Parse error"))
+            return
+
+        task = asyncio.create_task(self.dispatch(message))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def handle_client(self):
+        """Read loop: one JSON-RPC message per line, dispatched concurrently"""
+        # One connection-lifetime buffer instead of a fresh bytes object per
+        # readuntil(): chunks append here and complete lines are parsed from
+        # memoryview slices, so orjson reads the frame without another copy
+        buf = bytearray()
+        discarding = False  # inside an over-long line, dropping until newline
+        try:
+            while True:
+                chunk = await self.reader.read(READ_CHUNK)
+                if not chunk:
+                    # EOF: a final unterminated line is still a message
+                    if buf and not discarding:
+                        await self._feed_line(memoryview(buf))
+                    break
+
+                if discarding:
+                    nl = chunk.find(b"\n")
+                    if nl == -1:
+                        continue
+                    discarding = False
+                    await self.send_response(err_bytes(-32600, "Request too large"))
+                    chunk = chunk[nl + 1:]
+                    if not chunk:
+                        continue
+
+                buf += chunk
+                start = 0
+                while True:
+                    nl = buf.find(b"\n", start)
+                    if nl == -1:
+                        break
+                    if nl - start > MAX_LINE_BYTES:
+                        # Complete lines must honor the cap too: otherwise a
+                        # frame whose newline lands in the same chunk that
+                        # crosses the limit would slip through, making the
+                        # limit depend on TCP segmentation
+                        logger.warning(f"Dropping oversized message (> {MAX_LINE_BYTES} bytes)")
+                        await self.send_response(err_bytes(-32600, "Request too large"))
+                    else:
+                        await self._feed_line(memoryview(buf)[start:nl])
+                    start = nl + 1
+                if start:
+                    del buf[:start]
+
+                if len(buf) > MAX_LINE_BYTES:
+                    # A runaway line would otherwise grow the buffer unbounded
+                    # and kill the connection; drop it and keep the stream alive
+                    logger.warning(f"Dropping oversized message (> {MAX_LINE_BYTES} bytes)")
+                    buf.clear()
+                    discarding = True
+        finally:
+            # Let in-flight requests finish before the connection closes
+            if self.tasks:
+                await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+# ============================================================================
+# TCP SERVER
+# ============================================================================
+
+async def handle_client_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Per-connection entry point"""
+    peer = writer.get_extra_info("peername")
+    logger.info(f"Client connected: {peer}")
+
+    # Small JSON-RPC frames back-to-back: Nagle would coalesce and delay them
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as e:
+            logger.warning(f"Could not set TCP_NODELAY for {peer}: {str(e)}")
+
+    writer.transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+
+    handler = MCPStdioHandler(reader, writer)
+    try:
+        await handler.handle_client()
+    except Exception as e:
+        logger.error(f"Error handling client {peer}: {str(e)}")
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+        logger.info(f"Client disconnected: {peer}")
+
+
+async def run_server():
+    """Start the TCP server"""
+    try:
+        server = await asyncio.start_server(
+            handle_client_connection,
+            BRIDGE_HOST,
+            BRIDGE_PORT,
+            # StreamReader high-water mark: pauses the transport once this
+            # much is buffered (the handler enforces MAX_LINE_BYTES itself)
+            limit=MAX_LINE_BYTES,
+        )
+        logger.info(f"Stdio bridge listening on {BRIDGE_HOST}:{BRIDGE_PORT}")
+        async with server:
+            await server.serve_forever()
+    finally:
+        await close_http_clients()
+
+
+if __name__ == "__main__":
+    # libuv event loop: the hot path is pure loop scheduling + socket I/O,
+    # where uvloop typically gives 2-4x over the stock selector loop
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        logger.warning("uvloop not available, using default event loop")
+    asyncio.run(run_server())